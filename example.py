@@ -1,9 +1,16 @@
 import asyncio
 import logging
+import sys
 
 from napcat_client import NapCatWebSocketClient
 from napcat_client import QQMessageChain, QQMessageType
 
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -12,26 +19,26 @@ async def main():
 
     @client.group_event()
     async def on_group_message(msg: dict):
-        logger.info(f"收到群聊消息：{msg}")
+        logger.info("收到群聊消息：%s", msg)
 
     @client.private_event()
     async def on_private_message(msg: dict):
-        logger.info(f"收到私聊消息：{msg}")
+        logger.info("收到私聊消息：%s", msg)
         msg_list = [QQMessageType.Text("收到私聊消息")]
         message_chain = QQMessageChain(msg_list)
         await client.send_direct_message(msg.get("user_id"), message_chain)
 
     @client.notice_event()
     async def on_notice_message(msg: dict):
-        logger.info(f"收到通知消息：{msg}")
+        logger.info("收到通知消息：%s", msg)
 
     @client.meta_event()
     async def on_meta_message(msg: dict):
-        logger.info(f"收到元消息：{msg}")
+        logger.info("收到元消息：%s", msg)
 
     @client.napcat_event()
     async def on_napcat_message(msg: dict):
-        logger.info(f"收到napcat消息：{msg}")
+        logger.info("收到napcat消息：%s", msg)
 
     config = {
         "bot_pid": 123456789,
@@ -42,4 +49,12 @@ async def main():
     await client.run(bt_uin=config["bot_pid"], ws_uri=config["ws_uri"], ws_token=config["ws_token"])
 
 
+# uvloop 的事件循环比默认实现快 2-4 倍，不支持 Windows，装不上就用默认循环
+if sys.platform != "win32":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
 asyncio.run(main())
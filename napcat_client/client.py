@@ -1,21 +1,40 @@
 import asyncio
-import json
-import uuid
-import traceback
+import msgspec
 import websockets
-from datetime import datetime
 import logging
 from typing import Union, Optional, Literal, Callable
 from .utils import QQMessageChain
 
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-
+# 库模块不配置 root logger，输出格式/级别交给使用方（见 example.py）
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 复用同一个 Decoder 实例，避免每条消息都重新构建解析器状态，
+# get_forward_msg/get_record 等可达 max_size (16 MiB) 的大响应也走同一实例
+# 回调接口对外暴露的是完整 dict，因此这里解码为 dict 而不是 Struct
+_EVENT_DECODER = msgspec.json.Decoder(dict)
+
+
+class _Req(msgspec.Struct):
+    """API 请求的固定结构，msgspec 对 Struct 按预定键序走编码快路径"""
+    action: str
+    params: dict
+    echo: str
+
+
+_REQ_ENCODER = msgspec.json.Encoder()
+
+# action 名是一个很小的固定集合，净化结果缓存起来，免去每次 RPC 的 str.replace
+_CLEAN_ACTION: dict[str, str] = {}
+
+# 回调注册位掩码，handle_message 用一次位与就能跳过没有任何回调的事件
+_M_GROUP = 1
+_M_PRIVATE = 2
+_M_NOTICE = 4
+_M_META = 8
+_M_NAPCAT = 16
+_M_EVENT_ANY = _M_GROUP | _M_PRIVATE | _M_NOTICE | _M_META
 
 
 def ws_compatible_connect(uri, *, extra_headers, **kwargs):
@@ -31,14 +50,21 @@ def ws_compatible_connect(uri, *, extra_headers, **kwargs):
     )
 
 
+# 新版 asyncio 实现支持 recv(decode=False)，文本帧可以不做 utf-8 解码直接拿 bytes
+_WS_NEW_ASYNCIO = False
+
 try:
     import websockets.asyncio.client
 
     if websockets.connect == websockets.asyncio.client.connect:
+        _WS_NEW_ASYNCIO = True
+
         def ws_compatible_connect(uri, *, extra_headers, **kwargs):
             """
             如果 ``websockets.connect`` 对应新版 ``asyncio`` 实现，需要把参数名 ``extra_headers`` 改为 ``additional_headers``
             """
+            # 新版 asyncio 实现没有 read_limit 参数，读缓冲由 max_queue 控制
+            kwargs.pop("read_limit", None)
             return websockets.connect(
                 uri,
                 additional_headers=extra_headers,
@@ -49,23 +75,57 @@ except ImportError:
 
 
 class NapCatWebSocketClient:
-    def __init__(self, ws_url: str = "ws://localhost:3001", access_token: Optional[str] = None):
+    def __init__(self, ws_url: str = "ws://localhost:3001", access_token: Optional[str] = None,
+                 compression: Optional[str] = "deflate", read_limit: int = 2**20, write_limit: int = 2**20):
+        """NapCat 正向 WebSocket 客户端
+
+        ``compression`` 默认开启 permessage-deflate；NapCat 服务端跑在本机或
+        内网时建议传 ``None``，省掉热路径上的 zlib 压缩/解压，仅公网链路保留压缩。
+        ``read_limit``/``write_limit`` 为收发缓冲阈值（字节）。
+        """
         self.ws_url = ws_url
         self.access_token = access_token
+        self.compression = compression
+        self.read_limit = read_limit
+        self.write_limit = write_limit
         self.self_id = None
         self.websocket = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.response_futures: dict[str, asyncio.Future] = {}
+        self._echo_ctr: int = 0
         self.shutdown_event = asyncio.Event()
         self.last_heartbeat: Optional[int] = None
         self.login_success_event: asyncio.Event = asyncio.Event()
         self._listening_task: Optional[asyncio.Task] = None
-        self.event_callbacks: dict[str, list[Callable]] = {
-            "group": [],
-            "private": [],
-            "notice": [],
-            "napcat": [],
-            "meta": []
+        self._send_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # 回调存成不可变元组快照，注册时整体替换；派发循环迭代的对象不会被
+        # 并发注册改到一半
+        self.event_callbacks: dict[str, tuple[Callable, ...]] = {
+            "group": (),
+            "private": (),
+            "notice": (),
+            "napcat": (),
+            "meta": ()
+        }
+        self._cb_mask: int = 0
+        self._napcat_cbs: tuple[Callable, ...] = ()
+        self._rebuild_dispatch()
+
+    def _rebuild_dispatch(self):
+        """重建 (post_type, message_type) -> 回调快照的派发表，仅在注册时调用"""
+        self._dispatch: dict[tuple, tuple[Callable, ...]] = {
+            ("message", "group"): self.event_callbacks["group"],
+            ("message", "private"): self.event_callbacks["private"],
+            ("notice", None): self.event_callbacks["notice"],
+            ("meta_event", None): self.event_callbacks["meta"],
         }
+        self._napcat_cbs = self.event_callbacks["napcat"]
+
+    def _subscribe(self, kind: str, mask_bit: int, func: Callable):
+        self.event_callbacks[kind] = (*self.event_callbacks[kind], func)
+        self._cb_mask |= mask_bit
+        self._rebuild_dispatch()
 
     async def run(self, bt_uin: str, ws_uri: str, ws_token: Optional[str] = None, ws_listen_ip: str = "0.0.0.0"):
         self.self_id = bt_uin
@@ -86,7 +146,7 @@ class NapCatWebSocketClient:
 
         con_resp = await self.connect()
         if con_resp.get("status") == "ok":
-            self._listening_task = asyncio.create_task(self.listen_messages())
+            self._listening_task = self._loop.create_task(self.listen_messages())
 
             login_info = await self.get_login_info()
             login_id = login_info.get("data", {}).get("user_id")
@@ -123,52 +183,92 @@ class NapCatWebSocketClient:
 
         logger.info(f"连接到 {self.ws_url}")
         try:
-            self.websocket = await ws_compatible_connect(self.ws_url, extra_headers=headers, max_size=2**24, open_timeout=5.0, ping_timeout=10.0)
+            self.websocket = await ws_compatible_connect(
+                self.ws_url, extra_headers=headers, max_size=2**24, open_timeout=5.0, ping_timeout=10.0,
+                compression=self.compression, read_limit=self.read_limit, write_limit=self.write_limit,
+                max_queue=256
+            )
+            # 缓存事件循环引用，热路径上直接用 loop.create_task 省去 get_running_loop
+            self._loop = asyncio.get_running_loop()
+            self._send_queue = asyncio.Queue()
+            self._writer_task = self._loop.create_task(self._drain_sends())
             return {"status": "ok"}
         except Exception as e:
             return {"status": "failed", "message": str(e)}
 
     def group_event(self):
         def wrapper(func):
-            self.event_callbacks["group"].append(func)
+            self._subscribe("group", _M_GROUP, func)
             return func
         return wrapper
 
     def private_event(self):
         def wrapper(func):
-            self.event_callbacks["private"].append(func)
+            self._subscribe("private", _M_PRIVATE, func)
             return func
         return wrapper
 
     def notice_event(self):
         def wrapper(func):
-            self.event_callbacks["notice"].append(func)
+            self._subscribe("notice", _M_NOTICE, func)
             return func
         return wrapper
 
     def napcat_event(self):
         def wrapper(func):
-            self.event_callbacks["napcat"].append(func)
+            self._subscribe("napcat", _M_NAPCAT, func)
             return func
         return wrapper
 
     def meta_event(self):
         def wrapper(func):
-            self.event_callbacks["meta"].append(func)
+            self._subscribe("meta", _M_META, func)
             return func
         return wrapper
 
+    async def _drain_sends(self):
+        """唯一的消息发送出口：排空发送队列，突发请求在一次唤醒内连续写出
+
+        NapCat 要求一帧一个 JSON 文档，帧本身无法合并；省下来的是每次发送
+        都挂起/唤醒一个协程的调度开销
+        """
+        queue = self._send_queue
+        send = self.websocket.send
+        try:
+            while True:
+                await send(await queue.get())
+                while not queue.empty():
+                    await send(queue.get_nowait())
+        except websockets.exceptions.ConnectionClosed:
+            logger.warning("🔌 发送队列因连接关闭而停止")
+
+    async def _recv_bytes_frames(self):
+        """以 bytes 逐帧产出消息，跳过 websockets 对文本帧的 utf-8 解码
+
+        JSON 解码器本身就按 bytes 工作，先解码成 str 再解析等于多扫一遍内存
+        """
+        recv = self.websocket.recv
+        try:
+            while True:
+                yield await recv(decode=False)
+        except websockets.exceptions.ConnectionClosedOK:
+            return
+
     async def listen_messages(self):
         """唯一的消息接收入口"""
         logger.info(f"🎧 开始监听账号 {self.self_id} 的消息...")
         try:
-            while not self.shutdown_event.is_set():
-                async for message in self.websocket:
-                    try:
-                        data = json.loads(message)
-                        await self.handle_message(data)
-                    except json.JSONDecodeError:
-                        logger.error(f"❌ 无法解析消息: {message}")
+            frames = self._recv_bytes_frames() if _WS_NEW_ASYNCIO else self.websocket
+            # async for 本身会迭代到连接关闭，外层 while 只是多一层无用的帧开销
+            async for message in frames:
+                if self.shutdown_event.is_set():
+                    break
+                try:
+                    data = _EVENT_DECODER.decode(message)
+                except msgspec.DecodeError:
+                    logger.error(f"❌ 无法解析消息: {message}")
+                    continue
+                await self.handle_message(data)
         except websockets.exceptions.ConnectionClosed:
             logger.warning("🔌 WebSocket 连接已关闭")
         except Exception as e:
@@ -188,53 +288,30 @@ class NapCatWebSocketClient:
 
         # Handle event messages - use create_task to avoid blocking message reception
         # This allows API response messages to be received even when event callbacks are executing
+        # (回调里常会 await send_action，其响应由本监听循环派发，因此不能内联 await 回调)
+        mask = self._cb_mask
         if "post_type" in data:
-            post_type = data.get("post_type")
-            if post_type == "message":
-                message_type = data.get('message_type')
-                if message_type == "group":
-                    if self.event_callbacks["group"]:
-                        # Create task to run event callback non-blockingly
-                        # This ensures listen_messages can continue receiving messages
-                        for func in self.event_callbacks["group"]:
-                            asyncio.create_task(func(data))
-                elif message_type == "private":
-                    if self.event_callbacks["private"]:
-                        for func in self.event_callbacks["private"]:
-                            asyncio.create_task(func(data))
-            elif post_type == "notice":
-                if self.event_callbacks["notice"]:
-                    for func in self.event_callbacks["notice"]:
-                        asyncio.create_task(func(data))
-            elif post_type == "meta_event":
-                if self.event_callbacks["meta"]:
-                    for func in self.event_callbacks["meta"]:
-                        asyncio.create_task(func(data))
-                # if data.get("meta_event_type") == "heartbeat":
-                #     if not self.last_heartbeat:
-                #         self.last_heartbeat = data.get('time')
-                #     else:
-                #         cur_heartbeat = data.get('time')
-                #         print(f"heartbeat间隔：{cur_heartbeat - self.last_heartbeat}")
-                #         self.last_heartbeat = cur_heartbeat
-                #     print(f"   💓 心跳事件 (间隔: {data.get('interval')}ms)")
-                # elif data.get("meta_event_type") == "lifecycle":
-                #     print("启动成功")
-                else:
-                    pass
-                    # print(f"   元事件: {json.dumps(data, ensure_ascii=False, indent=2)}")
-            else:
-                pass
-                # print(f"   完整数据: {json.dumps(data, ensure_ascii=False, indent=2)}")
+            # 纯 RPC 用法不注册任何事件回调，一次位与即可整体跳过派发
+            if mask & _M_EVENT_ANY:
+                post_type = data.get("post_type")
+                # message 事件按 message_type 细分，其余事件 message_type 取 None
+                cbs = self._dispatch.get((post_type, data.get("message_type")))
+                if cbs:
+                    # Create task to run event callback non-blockingly
+                    # This ensures listen_messages can continue receiving messages
+                    create_task = self._loop.create_task
+                    for func in cbs:
+                        create_task(func(data))
             return
 
         # Other messages
         # print(f"❓ [{timestamp}] 未知消息:")
         # print(f"   {json.dumps(data, ensure_ascii=False, indent=2)}")
 
-        if self.event_callbacks["napcat"]:
-            for func in self.event_callbacks["napcat"]:
-                asyncio.create_task(func(data))
+        if mask & _M_NAPCAT:
+            create_task = self._loop.create_task
+            for func in self._napcat_cbs:
+                create_task(func(data))
 
     async def send_group_message(self, group_id: str, msg: QQMessageChain):
         message_dict = {
@@ -303,30 +380,37 @@ class NapCatWebSocketClient:
 
     async def send_action(self, action: str, params: dict, timeout: float = 10.0) -> dict:
         """发送API请求并等待响应"""
-        echo = str(uuid.uuid4())
+        # 单调递增计数器做 echo 就足够唯一，比 uuid4 少一次随机数生成和格式化
+        self._echo_ctr += 1
+        echo = str(self._echo_ctr)
 
-        # 创建Future来等待响应
-        future = asyncio.Future()
+        # 创建Future来等待响应（loop.create_future 返回 C 实现的 Future）
+        future = self._loop.create_future()
         self.response_futures[echo] = future
 
-        message = {
-            "action": action.replace("/", ""),
-            "params": params,
-            "echo": echo
-        }
+        clean_action = _CLEAN_ACTION.get(action)
+        if clean_action is None:
+            clean_action = _CLEAN_ACTION[action] = action.replace("/", "")
+
+        message = _Req(action=clean_action, params=params, echo=echo)
 
         try:
-            await self.websocket.send(json.dumps(message))
+            # 编码结果是 bytes，websockets 直接发 bytes 帧，省去一次 utf-8 编码
+            # 入队后由 _drain_sends 统一写出，突发请求不用逐个等待 socket
+            await self._send_queue.put(_REQ_ENCODER.encode(message))
             # print(f"📤 发送请求: {action} (echo: {echo})")
 
             # 等待响应（不调用recv，由监听任务处理）
             response = await asyncio.wait_for(future, timeout=timeout)
             return response
         except asyncio.TimeoutError:
-            await self.response_futures.pop(echo, None)
+            # dict.pop 是同步操作，之前误加 await 会把还挂着的 Future 再 await 一遍
+            future.cancel()
+            self.response_futures.pop(echo, None)
             raise TimeoutError(f"请求 {action} 超时")
         except Exception:
-            await self.response_futures.pop(echo, None)
+            future.cancel()
+            self.response_futures.pop(echo, None)
             raise
 
     async def get_login_info(self):
@@ -337,6 +421,8 @@ class NapCatWebSocketClient:
     async def close(self):
         self.shutdown_event.set()
         self.login_success_event.clear()
+        if self._writer_task and not self._writer_task.done():
+            self._writer_task.cancel()
         if self.websocket:
             await self.websocket.close()
         if self._listening_task and not self._listening_task.done():
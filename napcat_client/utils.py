@@ -2,177 +2,199 @@ from typing import Union, Optional, Type
 import re
 
 
+# 预编译 data URL 正则，避免每个消息段都查一次 re 缓存并匹配两次
+_DATA_URL_IMG = re.compile(r"data:image/(?:jpg|jpeg|png|gif|bmp|webp|tiff|svg);base64,(.*)")
+_DATA_URL_ANY = re.compile(r"data:[^/]+/[^;]+;base64,(.*)")
+
+
+# repr 在构造时算好存成普通属性，反复打日志时不再每次重新拼接 f-string；
+# 内容固定的类型直接用类属性常量
 class QQMessageType:
     class Text:
         def __init__(self, text: str):
             self.text: str = text
-
-        @property
-        def repr(self):
-            return self.text
+            self.repr: str = text
 
     class Image:
+        repr: str = "[Image]"
+
         def __init__(self, url=None, base64=None):
             self.url: Optional[str] = url
             self.base64: Optional[str] = base64
 
-        @property
-        def repr(self):
-            return "[Image]"
-
     class At:
         def __init__(self, pid: Union[int, str], nickname: Optional[str] = None):
             """set pid to 'all' to at all group members"""
             self.pid: str = str(pid)
             self.nickname: str = nickname
-
-        @property
-        def repr(self):
-            if self.nickname:
-                return f"[At {self.nickname}({self.pid})]"
+            if nickname:
+                self.repr: str = f"[At {nickname}({self.pid})]"
             else:
-                return f"[At {self.pid}]"
+                self.repr: str = f"[At {self.pid}]"
 
     class Reply:
         def __init__(self, message_id: Union[int, str], message_content: Optional[str] = None):
             self.message_id: str = str(message_id)
             self.message_content: str = message_content
-
-        @property
-        def repr(self):
-            return f"[Reply {self.message_id}]"
+            self.repr: str = f"[Reply {self.message_id}]"
 
     class Emoji:
         def __init__(self, emoji_id: Union[int, str]):
             self.emoji_id: str = str(emoji_id)
-
-        @property
-        def repr(self):
-            return f"[Emoji {self.emoji_id}]"
+            self.repr: str = f"[Emoji {self.emoji_id}]"
 
     class Sticker:
         def __init__(self, sticker_id: Union[int, str], sticker_bs64: str):
             self.sticker_id: str = str(sticker_id)
             self.sticker_bs64: str = sticker_bs64
-
-        @property
-        def repr(self):
-            return f"[Sticker {self.sticker_id}]"
+            self.repr: str = f"[Sticker {self.sticker_id}]"
 
     class Record:
+        repr: str = "[Record]"
+
         def __init__(self, bs64: str):
             self.bs64: str = bs64
 
-        @property
-        def repr(self):
-            return f"[Record]"
-
     class Notice:
+        repr: str = "[Notice]"
+
         def __init__(self, text: str):
             self.text = text
 
-        @property
-        def repr(self):
-            return f"[Notice]"
-
     class Poke:
+        repr: str = "[Poke]"
+
         def __init__(self, pid: Union[int, str]):
             self.pid = str(pid)
 
-        @property
-        def repr(self):
-            return f"[Poke]"
+
+def _ser_text(ele, msg_list):
+    msg_list.append({
+        "type": "text",
+        "data": {
+            "text": ele.text
+        }
+    })
+
+
+def _ser_image(ele, msg_list):
+    if ele.url:
+        file_param = ele.url
+    elif ele.base64:
+        if ele.base64.startswith("base64://"):
+            file_param = ele.base64
+        else:
+            m = _DATA_URL_IMG.match(ele.base64)
+            file_param = f"base64://{m.group(1)}" if m else ""
+    else:
+        file_param = ""
+
+    msg_list.append({
+        "type": "image",
+        "data": {
+            "file": file_param,
+            "summary": "[图片]"
+        }
+    })
+
+
+def _ser_at(ele, msg_list):
+    msg_list.append({
+        "type": "at",
+        "data": {
+            "qq": ele.pid,
+        }
+    })
+
+
+def _ser_reply(ele, msg_list):
+    # Reply 固定插在开头，只需看首个元素即可判断是否已有回复段
+    if msg_list and msg_list[0]["type"] == "reply":
+        return
+    msg_list.insert(0, {
+        "type": "reply",
+        "data": {
+            "id": ele.message_id
+        }
+    },)
+
+
+def _ser_emoji(ele, msg_list):
+    try:
+        msg_list.append({
+            "type": "face",
+            "data": {
+                "id": int(ele.emoji_id)
+            }
+        })
+    except:
+        pass
+
+
+def _ser_sticker(ele, msg_list):
+    if ele.sticker_bs64.startswith("base64://"):
+        file_param = ele.sticker_bs64
+    else:
+        m = _DATA_URL_IMG.match(ele.sticker_bs64)
+        file_param = f"base64://{m.group(1)}" if m else ""
+    msg_list.append({
+        "type": "image",
+        "data": {
+            "file": file_param,
+            "summary": "[动画表情]"
+        }
+    })
+
+
+def _ser_record(ele, msg_list):
+    if ele.bs64.startswith("base64://"):
+        file_param = ele.bs64
+    else:
+        m = _DATA_URL_ANY.match(ele.bs64)
+        file_param = f"base64://{m.group(1)}" if m else ""
+    msg_list.append({
+        "type": "record",
+        "data": {
+            "file": file_param
+        }
+    })
+
+
+# 按消息段类型 O(1) 分发，替代逐个 isinstance 判断
+_HANDLERS = {
+    QQMessageType.Text: _ser_text,
+    QQMessageType.Image: _ser_image,
+    QQMessageType.At: _ser_at,
+    QQMessageType.Reply: _ser_reply,
+    QQMessageType.Emoji: _ser_emoji,
+    QQMessageType.Sticker: _ser_sticker,
+    QQMessageType.Record: _ser_record,
+}
 
 
 class QQMessageChain:
     def __init__(self, msg_list: Optional[list] = None):
         self.msg_seg_list = msg_list if msg_list else []
+        self._serialized: Optional[list] = None
+
+    def append(self, ele):
+        self.msg_seg_list.append(ele)
+        self._serialized = None
+
+    def extend(self, eles):
+        self.msg_seg_list.extend(eles)
+        self._serialized = None
 
     def to_list(self):
-        msg_list = []
-        for ele in self.msg_seg_list:
-            if isinstance(ele, QQMessageType.Text):
-                msg_list.append({
-                    "type": "text",
-                    "data": {
-                        "text": ele.text
-                    }
-                })
-            elif isinstance(ele, QQMessageType.Image):
-                if ele.url:
-                    file_param = ele.url
-                elif ele.base64:
-                    if ele.base64.startswith("base64://"):
-                        file_param = ele.base64
-                    elif re.match(r"data:image/(jpg|jpeg|png|gif|bmp|webp|tiff|svg);base64,", ele.base64):
-                        m = re.match(r"data:image/(jpg|jpeg|png|gif|bmp|webp|tiff|svg);base64,(.*)", ele.base64)
-                        file_param = f"base64://{m.group(2)}"
-                    else:
-                        file_param = ""
-                else:
-                    file_param = ""
-
-                msg_list.append({
-                    "type": "image",
-                    "data": {
-                        "file": file_param,
-                        "summary": "[图片]"
-                    }
-                })
-            elif isinstance(ele, QQMessageType.At):
-                msg_list.append({
-                    "type": "at",
-                    "data": {
-                        "qq": ele.pid,
-                    }
-                })
-            elif isinstance(ele, QQMessageType.Reply):
-                if any(isinstance(item, QQMessageType.Reply) for item in msg_list):
-                    pass
-                else:
-                    msg_list.insert(0, {
-                        "type": "reply",
-                        "data": {
-                            "id": ele.message_id
-                        }
-                    },)
-            elif isinstance(ele, QQMessageType.Emoji):
-                try:
-                    msg_list.append({
-                        "type": "face",
-                        "data": {
-                            "id": int(ele.emoji_id)
-                        }
-                    })
-                except:
-                    pass
-            elif isinstance(ele, QQMessageType.Sticker):
-                if ele.sticker_bs64.startswith("base64://"):
-                    file_param = ele.sticker_bs64
-                elif re.match(r"data:image/(jpg|jpeg|png|gif|bmp|webp|tiff|svg);base64,", ele.sticker_bs64):
-                    m = re.match(r"data:image/(jpg|jpeg|png|gif|bmp|webp|tiff|svg);base64,(.*)", ele.sticker_bs64)
-                    file_param = f"base64://{m.group(2)}"
-                else:
-                    file_param = ""
-                msg_list.append({
-                    "type": "image",
-                    "data": {
-                        "file": file_param,
-                        "summary": "[动画表情]"
-                    }
-                })
-            elif isinstance(ele, QQMessageType.Record):
-                if ele.bs64.startswith("base64://"):
-                    file_param = ele.bs64
-                elif re.match(r"data:(.*)/(.*);base64,", ele.bs64):
-                    m = re.match(r"data:(.*)/(.*);base64,(.*)", ele.bs64)
-                    file_param = f"base64://{m.group(3)}"
-                else:
-                    file_param = ""
-                msg_list.append({
-                    "type": "record",
-                    "data": {
-                        "file": file_param
-                    }
-                })
-        return msg_list
+        """序列化消息链；结果会被缓存，同一条消息链群发时只序列化一次
+
+        注意：直接修改 ``msg_seg_list`` 不会使缓存失效，请使用 ``append``/``extend``
+        """
+        if self._serialized is None:
+            msg_list = []
+            for ele in self.msg_seg_list:
+                handler = _HANDLERS.get(type(ele))
+                if handler:
+                    handler(ele, msg_list)
+            self._serialized = msg_list
+        return self._serialized